@@ -1,7 +1,13 @@
+import os
+from typing import Optional
+
 import torch
 from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
 from vncorenlp import VnCoreNLP
 
+from micro_batcher import MicroBatcher
+from profiler import stage
+
 # ---------- Load once at startup ----------
 # Khởi tạo VnCoreNLP cho tách từ
 vncorenlp = VnCoreNLP("vncorenlp/VnCoreNLP-1.1.1.jar", annotators="wseg", max_heap_size='-Xmx500m')
@@ -16,16 +22,33 @@ text_classifier = pipeline("text-classification", model=model, tokenizer=tokeniz
 
 def preprocess_text(text: str) -> str:
     text = text.lower()
-    sentences = vncorenlp.tokenize(text)
+    with stage("vncorenlp"):
+        sentences = vncorenlp.tokenize(text)
     return ' '.join([' '.join(sen) for sen in sentences])
 
 
-def predict_ads(text: str) -> bool:
+def _classify_batch(processed_texts: list[str]) -> list[dict]:
+    return text_classifier(processed_texts, truncation=True, max_length=100, batch_size=len(processed_texts))
+
+
+# Gom input từ nhiều request đồng thời thành một forward pass
+ads_batcher = MicroBatcher(
+    batch_fn=_classify_batch,
+    length_fn=lambda t: len(tokenizer.tokenize(t)),
+    max_batch_size=int(os.getenv("ADS_BATCH_SIZE", "32")),
+    max_wait_ms=float(os.getenv("ADS_BATCH_WAIT_MS", "5")),
+    bucket_bounds=(16, 32, 64, 100),
+    name="ads_predict",
+)
+
+
+def predict_ads(text: str, timeout: Optional[float] = None) -> bool:
     if not text or not text.strip():
         raise ValueError("Input text must not be empty.")
 
     processed_text = preprocess_text(text)
-    result = text_classifier(processed_text, truncation=True, max_length=100)[0]
+    with stage("ads_batch_wait"):
+        result = ads_batcher(processed_text, timeout=timeout)
 
     label_id = int(result['label'].split('_')[-1]) if "label" in result['label'].lower() else 0
 
@@ -2,10 +2,12 @@ from similarity_label import get_best_label_from_content
 import streamlit as st
 import pandas as pd
 import hashlib
+import contextvars
 from typing import Dict, List, Tuple
 from io import BytesIO
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from label_inference import label_social_post
+from profiler import profile_session, is_admin_token
 from stqdm import stqdm
 
 # ========================== Utilities ==========================
@@ -64,7 +66,8 @@ def parallel_labeling(dedup_df: pd.DataFrame, category: str) -> Tuple[Dict[str,
 
     st.info("🔄 Running parallel labeling on unique posts...")
     with ThreadPoolExecutor(max_workers=8) as executor:
-        futures = {executor.submit(worker, row): row for _, row in dedup_df.iterrows()}
+        # copy_context để profiler (nếu bật) theo dõi được các worker thread
+        futures = {executor.submit(contextvars.copy_context().run, worker, row): row for _, row in dedup_df.iterrows()}
         for future in stqdm(as_completed(futures), total=len(futures)):
             signature, best_label, full_labels = future.result()
             label_mapping[signature] = best_label
@@ -116,11 +119,23 @@ with col1:
             max_rows = len(df)
             num_rows = st.slider("🔢 Number of rows to process", min_value=1, max_value=max_rows, value=min(100, max_rows))
 
+            with st.expander("🧪 Profiling (admin)"):
+                profile_run = st.checkbox("Profile this run")
+                admin_token = st.text_input("Admin token", type="password")
+
             if category and st.button("🚀 Start Labeling"):
                 df_subset = df.head(num_rows)
 
                 with st.spinner("⚙️ Processing... please wait."):
-                    processed_df = process_file(df_subset, category)
+                    if profile_run and is_admin_token(admin_token):
+                        with profile_session("process-file") as session:
+                            processed_df = process_file(df_subset, category)
+                        st.session_state["profile_report"] = session.report()
+                    else:
+                        if profile_run:
+                            st.warning("⚠️ Invalid admin token, running without profiling.")
+                        processed_df = process_file(df_subset, category)
+                        st.session_state.pop("profile_report", None)
 
                 st.session_state["processed_df"] = processed_df
                 st.success("✅ Labeling complete!")
@@ -141,6 +156,13 @@ with col2:
             label_counts.columns = ["Label", "Count"]
             st.dataframe(label_counts, use_container_width=True)
 
+        if "profile_report" in st.session_state:
+            with st.expander("🧪 Profile Breakdown"):
+                report = st.session_state["profile_report"]
+                st.write(f"Wall: {report['wall_ms']} ms — Samples: {report['samples']} — Flamegraph: {report['flamegraph']}")
+                stage_df = pd.DataFrame.from_dict(report["stages"], orient="index")
+                st.dataframe(stage_df, use_container_width=True)
+
         # Export button
         output = BytesIO()
         processed_df.to_excel(output, index=False)
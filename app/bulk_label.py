@@ -0,0 +1,396 @@
+"""
+Chạy gán nhãn hàng loạt không cần Streamlit.
+
+Ví dụ:
+    python bulk_label.py --input posts.parquet --category FMCG --out-dir runs/2026-10 --workers 4
+
+- Input: JSONL / CSV / Parquet, cùng các cột với `InputItem` trong main.py.
+- Bài viết được chia shard theo `text_signature` nên các bản trùng luôn nằm
+  cùng một shard và chỉ được gán nhãn một lần.
+- Mỗi shard ghi kết quả dần vào file `.part`, xong thì đổi tên thành file chính
+  và cập nhật `manifest.json`. Chạy lại cùng lệnh sẽ tiếp tục các shard chưa xong.
+"""
+import argparse
+import csv
+import json
+import multiprocessing as mp
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, List
+
+from taxonomy import label_fields
+from text_utils import get_text_signature, merge_text
+
+# Cùng các cột với main.InputItem
+INPUT_FIELDS = ["id", "topic_name", "type", "topic_id", "site_id", "site_name", "description", "title", "content"]
+
+OUTPUT_FIELDS = ["id", "topic_id", "site_id", "type", "text_signature",
+                 "label", "label_id", "ref_label_map", "ref_llm_label", "tier"]
+LIST_FIELDS = {"label_id", "ref_label_map", "ref_llm_label"}
+
+MANIFEST_NAME = "manifest.json"
+
+# Mỗi worker có JVM VnCoreNLP (~500MB) và hai model transformer riêng, nên mặc định giữ ít worker
+DEFAULT_WORKERS = max(1, min(4, (os.cpu_count() or 1) // 4))
+
+# Counter cộng vào manifest khi shard hoàn thành
+SHARD_COUNTERS = ("unique", "llm_calls", "input_tokens", "output_tokens")
+
+# Giá gpt-4o-mini (USD / 1M token), có thể ghi đè bằng tham số dòng lệnh
+DEFAULT_INPUT_PRICE = float(os.getenv("LLM_INPUT_PRICE_PER_M", "0.15"))
+DEFAULT_OUTPUT_PRICE = float(os.getenv("LLM_OUTPUT_PRICE_PER_M", "0.60"))
+
+
+# ====================== Input ======================
+
+def _normalize(record: dict) -> dict:
+    return {k: "" if record.get(k) is None else str(record.get(k)) for k in INPUT_FIELDS}
+
+
+def iter_input(path: str, batch_size: int = 10_000) -> Iterator[dict]:
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".jsonl", ".ndjson"):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield _normalize(json.loads(line))
+    elif ext == ".csv":
+        with open(path, encoding="utf-8", newline="") as f:
+            for record in csv.DictReader(f):
+                yield _normalize(record)
+    elif ext == ".parquet":
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+        columns = [c for c in INPUT_FIELDS if c in parquet_file.schema_arrow.names]
+        for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+            for record in batch.to_pylist():
+                yield _normalize(record)
+    else:
+        raise ValueError(f"Unsupported input format: {ext} (expected .jsonl, .csv or .parquet)")
+
+
+# ====================== Manifest ======================
+
+def _write_json_atomic(path: str, data: dict) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def shard_input_path(out_dir: str, shard_id: int) -> str:
+    return os.path.join(out_dir, "shards", f"shard-{shard_id:05d}.input.jsonl")
+
+
+def shard_output_path(out_dir: str, shard_id: int, fmt: str) -> str:
+    return os.path.join(out_dir, "results", f"shard-{shard_id:05d}.{fmt}")
+
+
+def plan_shards(input_path: str, out_dir: str, num_shards: int) -> List[dict]:
+    """Đọc input dạng stream và ghi từng bài vào shard theo text_signature."""
+    os.makedirs(os.path.join(out_dir, "shards"), exist_ok=True)
+    files = [open(shard_input_path(out_dir, i), "w", encoding="utf-8") for i in range(num_shards)]
+    rows = [0] * num_shards
+    try:
+        for record in iter_input(input_path):
+            sig = get_text_signature(record["title"], record["content"], record["description"])
+            shard_id = int(sig[:8], 16) % num_shards
+            record["text_signature"] = sig
+            files[shard_id].write(json.dumps(record, ensure_ascii=False) + "\n")
+            rows[shard_id] += 1
+    finally:
+        for f in files:
+            f.close()
+    return [{"id": i, "rows": rows[i], "status": "pending"} for i in range(num_shards)]
+
+
+def load_or_create_manifest(args) -> dict:
+    manifest_path = os.path.join(args.out_dir, MANIFEST_NAME)
+    params = {
+        "input": os.path.abspath(args.input),
+        "category": args.category,
+        "num_shards": args.shards,
+        "format": args.format,
+    }
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest["params"] != params:
+            raise SystemExit(
+                f"❌ {manifest_path} was created with different parameters: {manifest['params']}. "
+                "Use another --out-dir to start a new run."
+            )
+        print(f"🔁 Resuming run from {manifest_path}")
+        return manifest
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    print(f"🧩 Splitting {args.input} into {args.shards} shards...")
+    manifest = {
+        "params": params,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "shards": plan_shards(args.input, args.out_dir, args.shards),
+        "counters": {"unique": 0, "llm_calls": 0, "input_tokens": 0, "output_tokens": 0},
+    }
+    _write_json_atomic(manifest_path, manifest)
+    return manifest
+
+
+# ====================== Worker process ======================
+
+_counters: Dict[str, "mp.sharedctypes.Synchronized"] = {}
+
+
+def _init_worker(counters: dict, torch_threads: int) -> None:
+    # Model chỉ được load trong worker, process cha không cần torch/VnCoreNLP
+    global _counters, label_social_post, get_best_label_from_content, get_usage_metadata_callback
+    _counters = counters
+    # Worker gán nhãn tuần tự từng bài, không có request đồng thời để gom batch -> bỏ thời gian chờ
+    os.environ["ADS_BATCH_WAIT_MS"] = "0"
+    os.environ["EMBEDDING_BATCH_WAIT_MS"] = "0"
+    import torch
+    torch.set_num_threads(torch_threads)
+    from langchain_core.callbacks import get_usage_metadata_callback
+    from label_inference import label_social_post
+    from similarity_label import get_best_label_from_content
+
+
+def _add(name: str, value: int, shard_counters: Counter) -> None:
+    # Counter dùng chung chỉ để báo tiến độ; manifest chỉ cộng counter của shard đã xong
+    shard_counters[name] += value
+    counter = _counters[name]
+    with counter.get_lock():
+        counter.value += value
+
+
+def _label_one(record: dict, category: str, shard_counters: Counter) -> tuple:
+    with get_usage_metadata_callback() as usage_cb:
+        result = label_social_post(
+            text=merge_text(record["title"], record["content"], record["description"]),
+            category=category,
+            type=record["type"],
+            site_name=record["site_name"],
+            topic_name=record["topic_name"],
+        )
+    for usage in usage_cb.usage_metadata.values():
+        _add("llm_calls", 1, shard_counters)
+        _add("input_tokens", usage.get("input_tokens", 0), shard_counters)
+        _add("output_tokens", usage.get("output_tokens", 0), shard_counters)
+
+    labels = result.get("labels", [])
+    best_label = get_best_label_from_content(labels_input=labels, category=category) if labels else []
+    return labels, best_label, result.get("tier", "")
+
+
+class _ShardWriter:
+    def __init__(self, path: str, fmt: str, flush_every: int = 500):
+        self.path = path
+        self.fmt = fmt
+        self.flush_every = flush_every
+        self._buffer: List[dict] = []
+        self._writer = None
+        self._file = open(path, "w", encoding="utf-8") if fmt == "jsonl" else None
+
+    def write(self, row: dict) -> None:
+        if self._file is not None:
+            self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+            self._file.flush()
+            return
+        self._buffer.append(row)
+        if len(self._buffer) >= self.flush_every:
+            self._flush_parquet()
+
+    def _flush_parquet(self) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([(name, pa.list_(pa.string()) if name in LIST_FIELDS else pa.string())
+                            for name in OUTPUT_FIELDS])
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, schema)
+        if self._buffer:
+            self._writer.write_table(pa.Table.from_pylist(self._buffer, schema=schema))
+        self._buffer = []
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            return
+        # Luôn tạo writer để shard rỗng vẫn có file parquet hợp lệ
+        self._flush_parquet()
+        self._writer.close()
+
+
+def process_shard(task: dict) -> dict:
+    shard_id, out_dir, category, fmt = task["id"], task["out_dir"], task["category"], task["format"]
+    groups: Dict[str, List[dict]] = {}
+    with open(shard_input_path(out_dir, shard_id), encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            groups.setdefault(record["text_signature"], []).append(record)
+
+    final_path = shard_output_path(out_dir, shard_id, fmt)
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+    part_path = f"{final_path}.part"
+    writer = _ShardWriter(part_path, fmt)
+    started = time.time()
+    shard_counters: Counter = Counter()
+    try:
+        for sig, records in groups.items():
+            labels, best_label, tier = _label_one(records[0], category, shard_counters)
+            # Cùng cách dựng cột nhãn với API để kết quả bulk khớp với /api/label-inference
+            fields = label_fields(best_label, labels, tier)
+            for record in records:
+                writer.write({
+                    "id": record["id"],
+                    "topic_id": record["topic_id"],
+                    "site_id": record["site_id"],
+                    "type": record["type"],
+                    "text_signature": sig,
+                    **fields,
+                })
+            _add("rows", len(records), shard_counters)
+            _add("unique", 1, shard_counters)
+    finally:
+        writer.close()
+
+    os.replace(part_path, final_path)
+    return {"id": shard_id, "rows": sum(len(r) for r in groups.values()), "unique": len(groups),
+            "output": os.path.relpath(final_path, out_dir), "seconds": round(time.time() - started, 3),
+            "counters": {name: shard_counters[name] for name in SHARD_COUNTERS}}
+
+
+# ====================== Progress ======================
+
+def _format_eta(seconds: float) -> str:
+    if seconds == float("inf"):
+        return "--:--:--"
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+class ProgressReporter(threading.Thread):
+    def __init__(self, counters: dict, total_rows: int, done_rows: int, args, interval: float = 10.0):
+        super().__init__(daemon=True)
+        self.counters = counters
+        self.total_rows = total_rows
+        self.done_rows = done_rows
+        self.args = args
+        self.interval = interval
+        self.started = time.time()
+        self._stop_event = threading.Event()
+
+    def snapshot(self) -> dict:
+        values = {name: counter.value for name, counter in self.counters.items()}
+        elapsed = max(time.time() - self.started, 1e-9)
+        rate = values["rows"] / elapsed
+        remaining = self.total_rows - self.done_rows - values["rows"]
+        cost = (values["input_tokens"] * self.args.input_price + values["output_tokens"] * self.args.output_price) / 1e6
+        return {
+            **values,
+            "elapsed": elapsed,
+            "rows_per_sec": rate,
+            "eta": remaining / rate if rate > 0 else float("inf"),
+            "cost_usd": cost,
+        }
+
+    def line(self) -> str:
+        s = self.snapshot()
+        done = self.done_rows + s["rows"]
+        pct = 100.0 * done / self.total_rows if self.total_rows else 100.0
+        return (f"[{done}/{self.total_rows} {pct:.1f}%] {s['rows_per_sec']:.1f} rows/s, ETA {_format_eta(s['eta'])} | "
+                f"unique {s['unique']} | LLM calls {s['llm_calls']}, tokens {s['input_tokens']}/{s['output_tokens']}, "
+                f"~${s['cost_usd']:.4f}")
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            print(self.line(), flush=True)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
+# ====================== Main ======================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk auto-labeling of social posts")
+    parser.add_argument("--input", required=True, help="Input file (.jsonl, .csv or .parquet)")
+    parser.add_argument("--category", required=True, help="Category (ngành), e.g. FMCG")
+    parser.add_argument("--out-dir", required=True, help="Run directory for shards, results and manifest")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Number of worker processes (each loads its own models and JVM)")
+    parser.add_argument("--shards", type=int, default=64, help="Number of shards (resume granularity)")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="parquet", help="Output format")
+    parser.add_argument("--progress-interval", type=float, default=10.0, help="Seconds between progress lines")
+    parser.add_argument("--input-price", type=float, default=DEFAULT_INPUT_PRICE, help="USD per 1M input tokens")
+    parser.add_argument("--output-price", type=float, default=DEFAULT_OUTPUT_PRICE, help="USD per 1M output tokens")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    manifest = load_or_create_manifest(args)
+    manifest_path = os.path.join(args.out_dir, MANIFEST_NAME)
+
+    pending = [s for s in manifest["shards"] if s["status"] != "done"]
+    total_rows = sum(s["rows"] for s in manifest["shards"])
+    done_rows = total_rows - sum(s["rows"] for s in pending)
+    if not pending:
+        print("✅ All shards are already done.")
+        return 0
+    print(f"🚀 {len(pending)} shard(s) pending, {total_rows - done_rows} rows, {args.workers} worker(s)")
+
+    ctx = mp.get_context("spawn")
+    counters = {name: ctx.Value("q", 0) for name in ("rows", "unique", "llm_calls", "input_tokens", "output_tokens")}
+    reporter = ProgressReporter(counters, total_rows, done_rows, args, interval=args.progress_interval)
+    reporter.start()
+
+    tasks = [{"id": s["id"], "out_dir": args.out_dir, "category": args.category, "format": args.format}
+             for s in pending]
+    shards_by_id = {s["id"]: s for s in manifest["shards"]}
+    workers = min(args.workers, len(tasks))
+    torch_threads = max(1, (os.cpu_count() or 1) // workers)
+    failed = 0
+    # ProcessPoolExecutor báo BrokenProcessPool khi worker chết/khởi tạo lỗi thay vì spawn lại mãi như Pool
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker,
+                             initargs=(counters, torch_threads)) as executor:
+        futures = [executor.submit(process_shard, task) for task in tasks]
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except BrokenProcessPool as e:
+                # Shard lỗi giữ trạng thái pending để lần chạy sau xử lý lại
+                failed += 1
+                print(f"❌ Worker pool broken (model loading failed?): {e}", file=sys.stderr)
+                continue
+            except Exception as e:
+                failed += 1
+                print(f"❌ Shard failed: {e}", file=sys.stderr)
+                continue
+            shard_counters = result.pop("counters")
+            for name in SHARD_COUNTERS:
+                manifest["counters"][name] += shard_counters[name]
+            shards_by_id[result["id"]].update(status="done", **{k: v for k, v in result.items() if k != "id"})
+            _write_json_atomic(manifest_path, manifest)
+
+    reporter.stop()
+    manifest["counters"]["cost_usd"] = round(
+        (manifest["counters"]["input_tokens"] * args.input_price
+         + manifest["counters"]["output_tokens"] * args.output_price) / 1e6, 6)
+    _write_json_atomic(manifest_path, manifest)
+    print(reporter.line())
+
+    if failed:
+        print(f"⚠️ {failed} shard(s) failed; rerun the same command to resume.", file=sys.stderr)
+        return 1
+    print(f"✅ Done. Results in {os.path.join(args.out_dir, 'results')}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
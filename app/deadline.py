@@ -0,0 +1,50 @@
+import os
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Budget tối thiểu (ms) cần còn lại để chạy từng tầng, dưới mức này thì hạ xuống tầng rẻ hơn
+LLM_MIN_BUDGET_MS = float(os.getenv("LLM_MIN_BUDGET_MS", "2500"))
+PINECONE_MIN_BUDGET_MS = float(os.getenv("PINECONE_MIN_BUDGET_MS", "300"))
+EMBEDDING_MIN_BUDGET_MS = float(os.getenv("EMBEDDING_MIN_BUDGET_MS", "150"))
+
+# Tầng đã tạo ra kết quả của một bài viết
+TIER_RULE = "rule"
+TIER_LLM = "llm"
+TIER_EMBEDDING = "embedding"
+TIER_NONE = "none"
+
+
+class Deadline:
+    """Latency budget của một request, dùng chung cho mọi bước trong pipeline."""
+
+    def __init__(self, budget_ms: float):
+        self.budget_ms = budget_ms
+        self.expires_at = time.monotonic() + budget_ms / 1000.0
+
+    @classmethod
+    def from_ms(cls, *budgets_ms: Optional[float]) -> Optional["Deadline"]:
+        # Nhận budget từ nhiều nguồn (field, header), lấy giá trị chặt nhất
+        values = [b for b in budgets_ms if b is not None]
+        return cls(min(values)) if values else None
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def remaining_ms(self) -> float:
+        return self.remaining() * 1000.0
+
+    def covers(self, cost_ms: float) -> bool:
+        return self.remaining_ms() >= cost_ms
+
+
+def covers(deadline: Optional[Deadline], cost_ms: float) -> bool:
+    return deadline is None or deadline.covers(cost_ms)
+
+
+def remaining_or_none(deadline: Optional[Deadline]) -> Optional[float]:
+    # Timeout (giây) cho một lời gọi chặn; None = chờ không giới hạn như trước
+    return None if deadline is None else deadline.remaining()
@@ -1,5 +1,6 @@
 import os
 import re
+from typing import Optional
 
 from dotenv import load_dotenv
 from langchain_core.exceptions import OutputParserException
@@ -10,7 +11,13 @@ from langfuse import Langfuse
 from langfuse.langchain import CallbackHandler
 from summa.summarizer import summarize
 
+from openai import APIError, APITimeoutError
+
 from ads_predict import predict_ads
+from deadline import (Deadline, EMBEDDING_MIN_BUDGET_MS, LLM_MIN_BUDGET_MS, PINECONE_MIN_BUDGET_MS,
+                      TIER_EMBEDDING, TIER_LLM, TIER_NONE, TIER_RULE, covers, remaining_or_none)
+from profiler import stage
+from similarity_label import nearest_taxonomy_label
 
 load_dotenv()
 
@@ -26,7 +33,8 @@ langfuse = Langfuse(
 
 # === Hàm tóm tắt nội dung nếu dài hơn 100 từ (không dùng LLM) ===
 def summarize_text_locally(text: str, word_limit: int = 50) -> str:
-    summary = summarize(text, words=word_limit, language='english')
+    with stage("summarize"):
+        summary = summarize(text, words=word_limit, language='english')
     if not summary:
         summary = '. '.join(text.split('. ')[:2])
     return summary
@@ -39,14 +47,26 @@ def prepare_text(text: str) -> str:
         return summarize_text_locally(text)
     return ' '.join(words[:100])
 
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "60"))
+
 llm = ChatOpenAI(
     model="gpt-4o-mini",
     max_tokens=None,
-    timeout=None,
+    timeout=LLM_TIMEOUT_S,
     max_retries=2,
     api_key=os.getenv("OPENAI_API_KEY")
 )
 
+# Dùng khi request có deadline: không retry, timeout theo budget còn lại (bind lúc gọi).
+# Hết timeout thì client OpenAI tự hủy HTTP request, không để lại call treo.
+budget_llm = ChatOpenAI(
+    model="gpt-4o-mini",
+    max_tokens=None,
+    timeout=LLM_TIMEOUT_S,
+    max_retries=0,
+    api_key=os.getenv("OPENAI_API_KEY")
+)
+
 # === Parser JSON chuẩn ===
 parser = JsonOutputParser()
 
@@ -74,32 +94,58 @@ Nội dung: "{text}"
 """)
 
 # === Gộp thành một Agentic Chain chuẩn hóa ===
-label_chain = (
-        {
-            "text": lambda x: prepare_text(x["text"]),
-            "domain": lambda x: x["domain"],
-            "topic_name": lambda x: x["topic_name"],
-        }
-        | prompt
-        | llm
-        | parser
-)
+def build_label_chain(model, prepare=prepare_text):
+    return (
+            {
+                "text": lambda x: prepare(x["text"]),
+                "domain": lambda x: x["domain"],
+                "topic_name": lambda x: x["topic_name"],
+            }
+            | prompt
+            | model
+            | parser
+    )
+
+
+label_chain = build_label_chain(llm)
 
 
-def label_social_post(text: str, category: str, type: str, site_name: str, topic_name: str) -> dict:
+# === Tầng rẻ khi không đủ budget cho LLM: nhãn gần nhất trong taxonomy theo embedding ===
+def label_by_embedding(prepared_text: str, category: str, deadline: Optional[Deadline]) -> dict:
+    # Chỉ chọn trong nhãn của category; không có danh sách nhãn của category thì không gán nhãn
+    if not covers(deadline, EMBEDDING_MIN_BUDGET_MS):
+        return {"labels": [], "confidence": 0.0, "tier": TIER_NONE}
+    try:
+        match = nearest_taxonomy_label(prepared_text, category, deadline)
+    except TimeoutError:
+        match = None
+    if match is None:
+        return {"labels": [], "confidence": 0.0, "tier": TIER_NONE}
+    label, score = match
+    return {"labels": [label], "confidence": round(score, 4), "tier": TIER_EMBEDDING}
+
+
+def label_social_post(text: str, category: str, type: str, site_name: str, topic_name: str,
+                      deadline: Optional[Deadline] = None) -> dict:
     text_lower = text.lower()
     # check ads service
-    ads_predict = predict_ads(text)
+    try:
+        ads_predict = predict_ads(text, timeout=remaining_or_none(deadline))
+    except TimeoutError:
+        # Hết budget khi chờ model ads: bỏ qua check ads, đi tiếp các rule từ khóa
+        ads_predict = False
     if ads_predict and type not in ('newsTopic', 'fbPageTopic'):
         return {
             "labels": ["Rao vặt"],
-            "confidence": 1.0
+            "confidence": 1.0,
+            "tier": TIER_RULE
         }
     if type != 'newsTopic':
         if any(keyword in text_lower for keyword in ["minigame", "mini game", "mini-game"]):
             return {
                 "labels": ["Minigame"],
-                "confidence": 1.0
+                "confidence": 1.0,
+                "tier": TIER_RULE
             }
 
         if any(keyword in text_lower for keyword in [
@@ -119,13 +165,15 @@ def label_social_post(text: str, category: str, type: str, site_name: str, topic
             ]):
             return {
                 "labels": ["Tuyển dụng"],
-                "confidence": 1.0
+                "confidence": 1.0,
+                "tier": TIER_RULE
             }
 
         if any(keyword in text_lower for keyword in ["livestream", "live stream"]):
             return {
                 "labels": ["Livestream"],
-                "confidence": 1.0
+                "confidence": 1.0,
+                "tier": TIER_RULE
             }
 
     if category in ['FMCG', 'Retail', 'Banking', 'Digital Payments', 'Insurance',
@@ -139,30 +187,50 @@ def label_social_post(text: str, category: str, type: str, site_name: str, topic
                 keyword in text_lower for keyword in ["chứng khoán", "index", "in-dex", "vn30", "vnindex"]):
             return {
                 "labels": ["Chứng khoán"],
-                "confidence": 1.0
+                "confidence": 1.0,
+                "tier": TIER_RULE
             }
+    if deadline is None:
+        chain, chain_text = label_chain, text
+    else:
+        # Tóm tắt trước rồi mới đọc budget còn lại, để timeout của LLM không vượt deadline
+        chain_text = prepare_text(text)
+        # Giữ lại budget cho bước map nhãn LLM sang taxonomy (Pinecone) sau khi LLM trả về
+        if not covers(deadline, LLM_MIN_BUDGET_MS + PINECONE_MIN_BUDGET_MS):
+            return label_by_embedding(chain_text, category, deadline)
+        llm_timeout = deadline.remaining() - PINECONE_MIN_BUDGET_MS / 1000.0
+        chain = build_label_chain(budget_llm.bind(timeout=llm_timeout), prepare=lambda t: t)
     try:
-        label_inf = label_chain.invoke(
-            {
-                "text": text,
-                "domain": category,
-                "topic_name": topic_name
-            },
-            config={"callbacks": [langfuse_handler]},
-        )
+        with stage("llm"):
+            label_inf = chain.invoke(
+                {
+                    "text": chain_text,
+                    "domain": category,
+                    "topic_name": topic_name
+                },
+                config={"callbacks": [langfuse_handler]},
+            )
         if label_inf is not None:
             label = label_inf.get("labels")
             if len(label) > 0:
-                return label_inf
+                return {**label_inf, "tier": TIER_LLM}
             else:
-                return {"labels": ["Đề cập chung"], "confidence": 1.0}
+                return {"labels": ["Đề cập chung"], "confidence": 1.0, "tier": TIER_LLM}
     except OutputParserException as e:
         print("⚠️ LLM trả về sai định dạng JSON:", e)
-        return {"labels": ["Đề cập chung"], "confidence": 1.0}
+        return {"labels": ["Đề cập chung"], "confidence": 1.0, "tier": TIER_LLM}
+    except APIError as e:
+        # Timeout luôn hạ tầng; khi có deadline (budget_llm không retry) thì mọi lỗi API (429, mất kết nối...)
+        # cũng hạ xuống tầng embedding thay vì trả nhãn rỗng
+        if deadline is not None or isinstance(e, APITimeoutError):
+            print("⏱️ LLM lỗi/timeout, hạ xuống tầng embedding:", e)
+            return label_by_embedding(chain_text if deadline is not None else prepare_text(text), category, deadline)
+        print("❌ Lỗi không xác định:", e)
     except Exception as e:
         print("❌ Lỗi không xác định:", e)
 
     return {
         "labels": [],
-        "confidence": 0.0
+        "confidence": 0.0,
+        "tier": TIER_NONE
     }
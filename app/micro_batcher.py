@@ -0,0 +1,178 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from queue import Queue, Empty
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from profiler import current_session, shared_thread_stage
+
+
+# === Histogram đơn giản: đếm số quan sát <= mỗi bound (không cộng dồn) ===
+class Histogram:
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.counts[bisect_left(self.bounds, value)] += 1
+            self.total += 1
+            self.sum += value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            buckets = {str(b): c for b, c in zip(self.bounds, self.counts)}
+            buckets["+Inf"] = self.counts[-1]
+            return {
+                "count": self.total,
+                "sum": self.sum,
+                "mean": self.sum / self.total if self.total else 0.0,
+                "buckets": buckets,
+            }
+
+
+BATCH_SIZE_BOUNDS = [1, 2, 4, 8, 16, 32, 64, 128]
+QUEUE_WAIT_MS_BOUNDS = [1, 2, 5, 10, 20, 50, 100, 250, 1000]
+
+
+class _Pending:
+    __slots__ = ("item", "future", "enqueued_at", "session")
+
+    def __init__(self, item: Any, future: Future, enqueued_at: float, session=None):
+        self.item = item
+        self.future = future
+        self.enqueued_at = enqueued_at
+        # Phiên profiling của request đã submit (nếu có)
+        self.session = session
+
+
+# === Dynamic micro-batcher: gom input từ nhiều request thành một forward pass ===
+class MicroBatcher:
+    """
+    Gom các input đơn lẻ từ nhiều request (nhiều thread) thành batch.
+
+    - submit(item) trả về Future, caller gọi .result() để nhận kết quả.
+    - Collector thread chờ tối đa `max_wait_ms` hoặc đến khi đủ `max_batch_size`.
+    - Input được chia theo bucket độ dài token (`length_fn`) để giảm padding,
+      mỗi bucket chạy đúng một lần `batch_fn`.
+    - `batch_fn(items)` phải trả về list kết quả cùng thứ tự, cùng độ dài.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        length_fn: Callable[[Any], int] = len,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        bucket_bounds: Sequence[int] = (16, 32, 64, 128, 256),
+        name: str = "batcher",
+    ):
+        self.batch_fn = batch_fn
+        self.length_fn = length_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.bucket_bounds = list(bucket_bounds)
+        self.name = name
+
+        self.batch_size_hist = Histogram(BATCH_SIZE_BOUNDS)
+        self.queue_wait_hist = Histogram(QUEUE_WAIT_MS_BOUNDS)
+
+        self._queue: "Queue[_Pending]" = Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        # Gunicorn fork worker sau khi import -> mỗi process cần collector riêng
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._queue = Queue()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-collector", daemon=True)
+            self._thread.start()
+
+    def submit(self, item: Any) -> Future:
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put(_Pending(item, future, time.perf_counter(), current_session()))
+        return future
+
+    def __call__(self, item: Any, timeout: Optional[float] = None) -> Any:
+        # Hết timeout: hủy input nếu collector chưa chạy tới và báo TimeoutError cho caller
+        future = self.submit(item)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": self._queue.qsize(),
+            "batch_size": self.batch_size_hist.snapshot(),
+            "queue_wait_ms": self.queue_wait_hist.snapshot(),
+        }
+
+    # ---------- Collector ----------
+    def _collect(self) -> List[_Pending]:
+        first = self._queue.get()
+        pending = [first]
+        deadline = first.enqueued_at + self.max_wait
+        while len(pending) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                pending.append(self._queue.get(timeout=remaining))
+            except Empty:
+                break
+        return pending
+
+    def _bucketize(self, pending: List[_Pending]) -> List[List[_Pending]]:
+        buckets: Dict[int, List[_Pending]] = defaultdict(list)
+        for p in pending:
+            try:
+                length = self.length_fn(p.item)
+            except Exception:
+                length = 0
+            buckets[bisect_left(self.bucket_bounds, length)].append(p)
+        return [buckets[k] for k in sorted(buckets)]
+
+    def _run(self) -> None:
+        while True:
+            pending = self._collect()
+            now = time.perf_counter()
+            for p in pending:
+                self.queue_wait_hist.observe((now - p.enqueued_at) * 1000.0)
+
+            for bucket in self._bucketize(pending):
+                bucket = [p for p in bucket if p.future.set_running_or_notify_cancel()]
+                if not bucket:
+                    continue
+                self.batch_size_hist.observe(len(bucket))
+                sessions = {p.session for p in bucket if p.session is not None}
+                try:
+                    with shared_thread_stage(f"{self.name}_forward", sessions):
+                        outputs = self.batch_fn([p.item for p in bucket])
+                    if len(outputs) != len(bucket):
+                        raise RuntimeError(
+                            f"{self.name}: batch_fn trả về {len(outputs)} kết quả cho {len(bucket)} input"
+                        )
+                except Exception as e:
+                    for p in bucket:
+                        p.future.set_exception(e)
+                    continue
+                for p, out in zip(bucket, outputs):
+                    p.future.set_result(out)
@@ -0,0 +1,201 @@
+import contextvars
+import hmac
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Set
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+
+# Phiên profiling của request hiện tại (None = không profile, stage() gần như no-op)
+_current_session: contextvars.ContextVar[Optional["ProfileSession"]] = contextvars.ContextVar(
+    "profile_session", default=None
+)
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+    if not PROFILE_ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token, PROFILE_ADMIN_TOKEN)
+
+
+# === Sampling profiler: chỉ lấy mẫu các thread thuộc phiên hiện tại ===
+class _Sampler(threading.Thread):
+    def __init__(self, session: "ProfileSession", interval: float):
+        super().__init__(name=f"profiler-{session.id}", daemon=True)
+        self.session = session
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            for tid in list(self.session.thread_ids):
+                frame = frames.get(tid)
+                if frame is not None:
+                    self.session.samples[_collapse(frame)] += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+def _collapse(frame) -> str:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+class _StageStat:
+    __slots__ = ("count", "wall", "cpu", "child_wall")
+
+    def __init__(self):
+        self.count = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.child_wall = 0.0
+
+
+class ProfileSession:
+    def __init__(self, label: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.thread_ids = {threading.get_ident()}
+        self.samples: Counter = Counter()
+        self.stages: Dict[str, _StageStat] = defaultdict(_StageStat)
+        self._stacks: Dict[int, List[list]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.output_path: Optional[str] = None
+
+    def attach_current_thread(self) -> None:
+        self.thread_ids.add(threading.get_ident())
+
+    def record_stage(self, name: str, wall: float, cpu: float, child_wall: float = 0.0) -> None:
+        with self._lock:
+            stat = self.stages[name]
+            stat.count += 1
+            stat.wall += wall
+            stat.cpu += cpu
+            stat.child_wall += child_wall
+
+    def save_collapsed(self, directory: str = PROFILE_DIR) -> Optional[str]:
+        # Định dạng collapsed stack: dùng được với flamegraph.pl và speedscope
+        if not self.samples:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.label}-{time.strftime('%Y%m%d-%H%M%S')}-{self.id}.collapsed")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        self.output_path = path
+        return path
+
+    def report(self) -> dict:
+        stages = {
+            name: {
+                "count": s.count,
+                "wall_ms": round(s.wall * 1000, 3),
+                "self_wall_ms": round((s.wall - s.child_wall) * 1000, 3),
+                "cpu_ms": round(s.cpu * 1000, 3),
+            }
+            for name, s in sorted(self.stages.items(), key=lambda kv: -kv[1].wall)
+        }
+        return {
+            "id": self.id,
+            "wall_ms": round(self.wall * 1000, 3),
+            "cpu_ms": round(self.cpu * 1000, 3),
+            "samples": sum(self.samples.values()),
+            "stages": stages,
+            "flamegraph": self.output_path,
+        }
+
+
+@contextmanager
+def profile_session(label: str, interval_ms: float = PROFILE_INTERVAL_MS, save: bool = True):
+    """
+    Bật profiling cho khối code hiện tại (một request hoặc một lần process_file).
+    Thread khác muốn được lấy mẫu phải chạy trong context đã copy
+    (contextvars.copy_context().run) và đi qua ít nhất một stage().
+    """
+    session = ProfileSession(label)
+    token = _current_session.set(session)
+    sampler = _Sampler(session, interval_ms / 1000.0)
+    start_wall, start_cpu = time.perf_counter(), time.thread_time()
+    sampler.start()
+    try:
+        yield session
+    finally:
+        sampler.stop()
+        session.wall = time.perf_counter() - start_wall
+        session.cpu = time.thread_time() - start_cpu
+        _current_session.reset(token)
+        if save:
+            session.save_collapsed()
+
+
+@contextmanager
+def stage(name: str):
+    """Đo wall/CPU time của một bước trong pipeline nếu đang có phiên profiling."""
+    session = _current_session.get()
+    if session is None:
+        yield
+        return
+
+    tid = threading.get_ident()
+    session.thread_ids.add(tid)
+    stack = session._stacks[tid]
+    frame = [name, 0.0]  # [tên stage, tổng wall của stage con]
+    stack.append(frame)
+    start_wall, start_cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - start_wall
+        cpu = time.thread_time() - start_cpu
+        stack.pop()
+        if stack:
+            stack[-1][1] += wall
+        session.record_stage(name, wall, cpu, frame[1])
+
+
+def current_session() -> Optional[ProfileSession]:
+    return _current_session.get()
+
+
+@contextmanager
+def shared_thread_stage(name: str, sessions: Set[ProfileSession]):
+    """
+    Đo một bước chạy trên thread dùng chung (vd. collector của MicroBatcher) cho các
+    phiên profiling có input trong bước đó: thread chỉ được lấy mẫu trong lúc chạy.
+    """
+    if not sessions:
+        yield
+        return
+
+    tid = threading.get_ident()
+    for session in sessions:
+        session.thread_ids.add(tid)
+    start_wall, start_cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - start_wall
+        cpu = time.thread_time() - start_cpu
+        for session in sessions:
+            session.thread_ids.discard(tid)
+            session.record_stage(name, wall, cpu)
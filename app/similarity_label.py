@@ -1,26 +1,125 @@
 import os
+import threading
 import time
+from typing import Optional
+import urllib3
 from pinecone import Pinecone, ServerlessSpec
 import torch
 import torch.nn.functional as F
 from transformers import AutoTokenizer, AutoModel
 from dotenv import load_dotenv
+
+from deadline import Deadline, EMBEDDING_MIN_BUDGET_MS, PINECONE_MIN_BUDGET_MS, covers, remaining_or_none
+from micro_batcher import MicroBatcher
+from profiler import stage
+from taxonomy import LABEL_TO_ID
+
 load_dotenv()
 
 API_KEY = os.getenv("PINECONE")
 pc = Pinecone(api_key=API_KEY)
 index_name = "semantic-label-v1"
-index = pc.Index(index_name)
+# PINECONE_INDEX_HOST cho phép trỏ thẳng tới data plane (vd. mock server khi load test)
+index_host = os.getenv("PINECONE_INDEX_HOST")
+index = pc.Index(host=index_host) if index_host else pc.Index(index_name)
 
 model_name = "AITeamVN/Vietnamese_Embedding"
 tokenizer  = AutoTokenizer.from_pretrained(model_name)
 model      = AutoModel.from_pretrained(model_name)
 
-def get_embedding(text: str) -> list[float]:
-    inputs = tokenizer(text, return_tensors="pt", truncation=True, padding=True)
+def _embed_batch(texts: list[str]) -> list[list[float]]:
+    inputs = tokenizer(texts, return_tensors="pt", truncation=True, padding=True)
     with torch.no_grad():
-        output = model(**inputs).last_hidden_state.mean(dim=1).squeeze()
-    return F.normalize(output, p=2, dim=0).cpu().tolist()
+        hidden = model(**inputs).last_hidden_state
+    # Mean pooling theo attention mask để padding trong batch không làm lệch vector
+    mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+    pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+    return F.normalize(pooled, p=2, dim=1).cpu().tolist()
+
+
+embedding_batcher = MicroBatcher(
+    batch_fn=_embed_batch,
+    length_fn=lambda t: len(tokenizer.tokenize(t)),
+    max_batch_size=int(os.getenv("EMBEDDING_BATCH_SIZE", "32")),
+    max_wait_ms=float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5")),
+    name="embedding",
+)
+
+
+def get_embedding(text: str, timeout: Optional[float] = None) -> list[float]:
+    with stage("embedding_batch_wait"):
+        return embedding_batcher(text, timeout=timeout)
+
+
+# ---------- Embedding của taxonomy (dùng cho tầng degrade khi hết budget LLM) ----------
+taxonomy_labels = list(LABEL_TO_ID)
+_taxonomy_rows = {label: i for i, label in enumerate(taxonomy_labels)}
+_taxonomy_matrix = None
+_taxonomy_lock = threading.Lock()
+
+# Nhãn thuộc từng category theo metadata Pinecone, load một lần mỗi process.
+# top_k tối đa của Pinecone khi include_metadata là 1000.
+CATEGORY_LABELS_TOP_K = 1000
+_category_labels: dict[str, list[str]] = {}
+
+
+def warm_taxonomy_embeddings(chunk_size: int = 64) -> torch.Tensor:
+    global _taxonomy_matrix
+    if _taxonomy_matrix is None:
+        with _taxonomy_lock:
+            if _taxonomy_matrix is None:
+                vectors = []
+                for i in range(0, len(taxonomy_labels), chunk_size):
+                    vectors.extend(_embed_batch(taxonomy_labels[i:i + chunk_size]))
+                _taxonomy_matrix = torch.tensor(vectors)
+    return _taxonomy_matrix
+
+
+def category_labels(category: str, deadline: Optional[Deadline] = None) -> Optional[list[str]]:
+    """
+    Nhãn taxonomy của category (cùng bộ lọc category với truy vấn Pinecone).
+    Trả về None khi chưa có trong cache mà không đủ budget / Pinecone lỗi trong budget.
+    """
+    labels = _category_labels.get(category)
+    if labels is not None:
+        return labels
+    if not covers(deadline, PINECONE_MIN_BUDGET_MS):
+        return None
+    query_kwargs = {} if deadline is None else {"_request_timeout": deadline.remaining()}
+    try:
+        with stage("pinecone"):
+            # Chỉ cần metadata của mọi vector khớp bộ lọc, vector truy vấn không quan trọng
+            response = index.query(
+                vector=[1.0] * model.config.hidden_size,
+                top_k=CATEGORY_LABELS_TOP_K,
+                filter={"category": category},
+                include_metadata=True,
+                **query_kwargs
+            )
+    except (TimeoutError, urllib3.exceptions.HTTPError) as e:
+        if deadline is None:
+            raise
+        print(f"[LOG] Category '{category}' => Label list timed out within latency budget: {e}")
+        return None
+    found = {match.get('metadata', {}).get("label") for match in response.get('matches', [])}
+    # Chỉ giữ nhãn có trong taxonomy để map_label_to_id luôn ra id hợp lệ
+    labels = [label for label in taxonomy_labels if label in found]
+    _category_labels[category] = labels
+    return labels
+
+
+def nearest_taxonomy_label(text: str, category: str,
+                           deadline: Optional[Deadline] = None) -> Optional[tuple[str, float]]:
+    # Chỉ xếp hạng nhãn thuộc category; None khi không có danh sách nhãn hoặc hết budget
+    labels = category_labels(category, deadline)
+    if not labels or not covers(deadline, EMBEDDING_MIN_BUDGET_MS):
+        return None
+    matrix = warm_taxonomy_embeddings()
+    with stage("taxonomy_match"):
+        rows = matrix[[_taxonomy_rows[label] for label in labels]]
+        scores = rows @ torch.tensor(get_embedding(text, timeout=remaining_or_none(deadline)))
+        best = int(torch.argmax(scores))
+    return labels[best], float(scores[best])
 
 def semantic_label_search(query_text: str, category: str, top_k: int = 5):
     query_vec = get_embedding(query_text)
@@ -42,18 +141,34 @@ def semantic_label_search(query_text: str, category: str, top_k: int = 5):
     return results
 
 
-def semantic_label_search(query_texts: list[str], category: str):
+def semantic_label_search(query_texts: list[str], category: str, deadline: Optional[Deadline] = None):
     top_labels = []
 
     for query_text in query_texts:
-        query_vec = get_embedding(query_text)
-
-        response = index.query(
-            vector=query_vec,
-            top_k=1,
-            filter={"category": category},
-            include_metadata=True
-        )
+        # Có deadline: dừng khi budget không đủ cho thêm một lượt embedding + Pinecone
+        if not covers(deadline, PINECONE_MIN_BUDGET_MS):
+            print(f"[LOG] Query: '{query_text}' => Skipped, latency budget exhausted.")
+            break
+        try:
+            query_vec = get_embedding(query_text, timeout=remaining_or_none(deadline))
+            # Embedding có thể dùng hết budget: kiểm tra lại để _request_timeout luôn > 0
+            if not covers(deadline, PINECONE_MIN_BUDGET_MS):
+                print(f"[LOG] Query: '{query_text}' => Skipped, latency budget exhausted after embedding.")
+                break
+            query_kwargs = {} if deadline is None else {"_request_timeout": deadline.remaining()}
+            with stage("pinecone"):
+                response = index.query(
+                    vector=query_vec,
+                    top_k=1,
+                    filter={"category": category},
+                    include_metadata=True,
+                    **query_kwargs
+                )
+        except (TimeoutError, urllib3.exceptions.HTTPError) as e:
+            if deadline is None:
+                raise
+            print(f"[LOG] Query: '{query_text}' => Timed out within latency budget: {e}")
+            break
 
         matches = response.get('matches', [])
         if matches:
@@ -82,9 +197,10 @@ def semantic_label_search(query_texts: list[str], category: str):
 def get_best_label_from_content(
     category: str,
     labels_input: list[str],
+    deadline: Optional[Deadline] = None,
 ) -> list[str]:
 
-    res = semantic_label_search(query_texts=labels_input, category=category)
+    res = semantic_label_search(query_texts=labels_input, category=category, deadline=deadline)
     if res:
         return res
 
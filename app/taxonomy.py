@@ -0,0 +1,220 @@
+# ====================== Label Taxonomy ======================
+# Tính sẵn một lần khi import, dùng chung cho API và bulk CLI
+
+LABEL_TO_ID = {
+    'Ra mắt sản phẩm mới': '68898a3c16a3634d8333820d',
+    'Thiết kế bao bì': '68898a3c16a3634d8333820e',
+    'Công nghệ cải tiến': '68898a3c16a3634d8333820f',
+    'Chất lượng sản phẩm': '68898a3c16a3634d83338210',
+    'Hương vị': '68898a3c16a3634d83338211',
+    'Nguồn gốc – Xuất xứ': '68898a3c16a3634d83338212',
+    'An toàn vệ sinh': '68898a3c16a3634d83338213',
+    'Công dụng': '68898a3c16a3634d83338214',
+    'Dị vật': '68898a3c16a3634d83338215',
+    'Trải nghiệm sử dụng': '68898a3c16a3634d83338216',
+    'Thành phần': '68898a3c16a3634d83338217',
+    'App/Website': '68898a3c16a3634d83338219',
+    'Thông tin sản phẩm': '68898a3c16a3634d83338227',
+    'Cơ sở vật chất': '68898a3c16a3634d83338239',
+    'Đổi trả sản phẩm': '68898a3c16a3634d8333823b',
+    'Số lượng đơn hàng': '68898a3c16a3634d8333823c',
+    'Thời gian giao hàng': '68898a3c16a3634d8333823d',
+    'Thiết kế': '68898a3c16a3634d8333823f',
+    'Nghiên cứu & phát triển': '68898a3c16a3634d83338245',
+    'Nâng cấp sản phẩm': '68898a3c16a3634d83338249',
+    'Tùy chỉnh sản phẩm': '68898a3c16a3634d8333824c',
+    'Hoán đổi sản phẩm': '68898a3c16a3634d8333824e',
+    'Thân thiện môi trường': '68898a3c16a3634d83338252',
+    'Chiến dịch': '68898a3c16a3634d83338253',
+    'Chương trình khuyến mãi': '68898a3c16a3634d83338254',
+    'KM Eshop/Ecommerce': '68898a3c16a3634d83338255',
+    'Sự kiện': '68898a3c16a3634d83338256',
+    'Hoạt động trên Fanpage': '68898a3c16a3634d83338257',
+    'Voucher': '68898a3c16a3634d83338258',
+    'Minigame': '68898a3c16a3634d83338259',
+    'Livestream': '68898a3c16a3634d8333825a',
+    'Bài đăng tương tác': '68898a3c16a3634d8333825b',
+    'Thông cáo báo chí': '68898a3c16a3634d8333825c',
+    'Hoạt động cộng đồng': '68898a3c16a3634d8333825d',
+    'Hoạt động truyền thông': '68898a3c16a3634d8333825e',
+    'Chương trình ưu đãi': '68898a3c16a3634d8333825f',
+    'Hợp tác quảng bá': '68898a3c16a3634d83338260',
+    'Nhận diện thương hiệu': '68898a3c16a3634d83338261',
+    'Chương trình khách hàng trung thành': '68898a3c16a3634d83338262',
+    'Quảng cáo': '68898a3c16a3634d83338264',
+    'Hội thảo trực tuyến': '68898a3c16a3634d83338265',
+    'Thảo luận giá cả': '68898a3c16a3634d83338266',
+    'So sánh giá': '68898a3c16a3634d83338267',
+    'Chính sách giảm giá': '68898a3c16a3634d83338268',
+    'Rao vặt': '68898a3c16a3634d83338269',
+    'Thuế': '68898a3c16a3634d83338273',
+    'Chăm sóc khách hàng': '68898a3c16a3634d83338277',
+    'Đăng ký mẫu thử': '68898a3c16a3634d83338278',
+    'Tư vấn trực tuyến': '68898a3c16a3634d83338279',
+    'Dịch vụ call center': '68898a3c16a3634d8333827b',
+    'Quấy rối khách hàng': '68898a3c16a3634d8333827c',
+    'Phản hồi/đánh giá': '68898a3c16a3634d8333827d',
+    'Độ hài lòng khách hàng': '68898a3c16a3634d8333827e',
+    'Khiếu nại khách hàng': '68898a3c16a3634d8333827f',
+    'Đánh giá sản phẩm': '68898a3c16a3634d83338280',
+    'Trung thành khách hàng': '68898a3c16a3634d83338281',
+    'Giới thiệu khách hàng': '68898a3c16a3634d83338282',
+    'Hỗ trợ qua chat': '68898a3c16a3634d83338283',
+    'Khảo sát ý kiến': '68898a3c16a3634d83338285',
+    'Hiệu suất tài chính': '68898a3c16a3634d83338286',
+    'Lợi nhuận doanh nghiệp': '68898a3c16a3634d83338288',
+    'Rủi ro tài chính': '68898a3c16a3634d83338289',
+    'Chứng khoán': '68898a3c16a3634d8333828a',
+    'Hình ảnh thương hiệu': '68898a3c16a3634d8333828b',
+    'Ban lãnh đạo': '68898a3c16a3634d8333828c',
+    'Đại hội cổ đông': '68898a3c16a3634d8333828e',
+    'Giải thưởng công ty': '68898a3c16a3634d8333828f',
+    'Hoạt động kinh doanh': '68898a3c16a3634d83338290',
+    'Quan hệ nhà đầu tư': '68898a3c16a3634d83338291',
+    'M&A/tái cấu trúc': '68898a3c16a3634d83338293',
+    'Hoạt động hợp tác': '68898a3c16a3634d83338294',
+    'Mở rộng kinh doanh': '68898a3c16a3634d83338295',
+    'Cổ tức': '68898a3c16a3634d83338296',
+    'Chương trình CSR': '68898a3c16a3634d83338298',
+    'Bảo vệ môi trường': '68898a3c16a3634d8333829a',
+    'Hỗ trợ cộng đồng': '68898a3c16a3634d8333829b',
+    'ESG bền vững': '68898a3c16a3634d8333829c',
+    'Quản lý chất thải': '68898a3c16a3634d8333829d',
+    'Năng lượng tái tạo': '68898a3c16a3634d8333829f',
+    'Hoạt động từ thiện': '68898a3c16a3634d833382a0',
+    'Vấn đề an toàn': '68898a3c16a3634d833382a1',
+    'Tai tiếng công ty': '68898a3c16a3634d833382a2',
+    'Thu hồi sản phẩm': '68898a3c16a3634d833382a3',
+    'Khiếu nại lớn': '68898a3c16a3634d833382a4',
+    'Phản hồi khủng hoảng': '68898a3c16a3634d833382a5',
+    'Tẩy chay thương hiệu': '68898a3c16a3634d833382a6',
+    'Rủi ro/gian lận': '68898a3c16a3634d833382a7',
+    'Tranh tụng pháp lý': '68898a3c16a3634d833382a8',
+    'Văn hóa công ty': '68898a3c16a3634d833382a9',
+    'Tuyển dụng': '68898a3c16a3634d833382aa',
+    'Phúc lợi nhân viên': '68898a3c16a3634d833382ab',
+    'Hoạt động nội bộ': '68898a3c16a3634d833382ad',
+    'Đào tạo nhân viên': '68898a3c16a3634d833382af',
+    'Lương nhân viên': '68898a3c16a3634d833382b0',
+    'Chế độ phúc lợi': '68898a3c16a3634d833382b1',
+    'Giữ chân nhân viên': '68898a3c16a3634d833382b2',
+    'Đánh giá hiệu suất': '68898a3c16a3634d833382b3',
+    'Chính sách pháp lý': '68898a3c16a3634d833382b4',
+    'Cạnh tranh ngành': '68898a3c16a3634d833382b6',
+    'Hợp tác/đối tác': '68898a3c16a3634d833382b7',
+    'So sánh thương hiệu': '68898a3c16a3634d833382b9',
+    'Phân tích thị trường': '68898a3c16a3634d833382bc',
+    'Thay đổi quy định': '68898a3c16a3634d833382bd',
+    'Chính sách thương mại': '68898a3c16a3634d833382be',
+    'Chính sách môi trường': '68898a3c16a3634d833382bf',
+    'Đề cập chung': '6889c65916a3634d833382c3',
+    'Bảo Vệ': '689556d589dc7939400b4003',
+    'Mua Sắm': '689556d689dc7939400b4004',
+    'Thực Phẩm': '689556d689dc7939400b4005',
+    'Đồ uống': '689556d689dc7939400b4006',
+    'Thái Độ': '689556d689dc7939400b4007',
+    'Lừa đảo': '689556d689dc7939400b400a',
+    'Talkshow/ Hội thảo': '689556d689dc7939400b400c',
+    'Thanh toán hóa đơn': '68898a3c16a3634d83338229',
+    'Cổ phiếu': '68898a3c16a3634d83338234',
+    'Khả năng sinh lời': '68898a3c16a3634d83338236',
+    'Nguồn cung đơn hàng': '68898a3c16a3634d83338237',
+    'Quy trình đổi trả': '68898a3c16a3634d8333823a',
+    'Không/giao trễ': '68898a3c16a3634d8333823e',
+    'Tính năng': '68898a3c16a3634d83338240',
+    'Chi phí vận chuyển': '68898a3c16a3634d83338241',
+    'Dịch vụ tư vấn': '68898a3c16a3634d83338243',
+    'Dịch vụ khách hàng': '68898a3c16a3634d83338247',
+    'Bảo hành sản phẩm': '68898a3c16a3634d83338248',
+    'Sửa chữa sản phẩm': '68898a3c16a3634d8333824a',
+    'Phụ kiện': '68898a3c16a3634d8333824b',
+    'Hoàn tiền': '68898a3c16a3634d8333824f',
+    'Lắp đặt sản phẩm': '68898a3c16a3634d83338250',
+    'Bảo trì': '68898a3c16a3634d83338251',
+    'Tình trạng hàng hóa': '68898a3c16a3634d83338274',
+    'Thanh toán trả góp': '68898a3c16a3634d83338275',
+    'Trải nghiệm khách hàng': '68898a3c16a3634d83338276',
+    'Phục vụ khách hàng': '68898a3c16a3634d8333827a',
+    'Chi nhánh/liên doanh': '68898a3c16a3634d8333828d',
+    'Thủ tục hành chính': '68898a3c16a3634d83338244',
+    'Phí/thu phí': '68898a3c16a3634d8333826e',
+    'Quy trình/thủ tục': '68898a3c16a3634d83338270',
+    'Hỗ trợ qua email': '68898a3c16a3634d83338284',
+    'Tiết kiệm năng lượng': '68898a3c16a3634d83338299',
+    'Tiết kiệm nước': '68898a3c16a3634d8333829e',
+    'Chương trình học bổng': '68898a3c16a3634d833382ba',
+    'Chương trình đào tạo': '689556d689dc7939400b4008',
+    'Câu lạc bộ': '689556d689dc7939400b4009',
+    'Dịch vụ smart banking': '68898a3c16a3634d8333821b',
+    'Dịch vụ chuyển tiền': '68898a3c16a3634d8333821c',
+    'Tài khoản cá nhân': '68898a3c16a3634d8333821d',
+    'Tài khoản doanh nghiệp': '68898a3c16a3634d8333821e',
+    'Credit cards cá nhân': '68898a3c16a3634d8333821f',
+    'Vay tiêu dùng': '68898a3c16a3634d83338220',
+    'Tín dụng doanh nghiệp': '68898a3c16a3634d83338221',
+    'Tiền gửi cá nhân': '68898a3c16a3634d83338222',
+    'Tiền gửi doanh nghiệp': '68898a3c16a3634d83338223',
+    'Thẻ ghi nợ': '68898a3c16a3634d83338224',
+    'Thẻ tín dụng': '68898a3c16a3634d83338225',
+    'Dịch vụ bảo hiểm': '68898a3c16a3634d83338226',
+    'Nạp tiền': '68898a3c16a3634d8333822a',
+    'Rút tiền': '68898a3c16a3634d8333822b',
+    'Thanh toán QR': '68898a3c16a3634d8333822c',
+    'Tiết kiệm trực tuyến': '68898a3c16a3634d8333822d',
+    'Vay trực tuyến': '68898a3c16a3634d8333822e',
+    'Chuyển tiền IBFT': '68898a3c16a3634d8333822f',
+    'Bảo mật': '68898a3c16a3634d83338230',
+    'Công cụ giao dịch': '68898a3c16a3634d83338231',
+    'Nền tảng giao dịch': '68898a3c16a3634d83338232',
+    'Chứng chỉ quỹ': '68898a3c16a3634d83338233',
+    'Danh mục đầu tư': '68898a3c16a3634d83338235',
+    'Thanh toán thẻ': '68898a3c16a3634d83338246',
+    'Dịch vụ thuê bao': '68898a3c16a3634d8333824d',
+    'Tiếp thị liên kết': '68898a3c16a3634d83338263',
+    'Tỉ giá tiền tệ': '68898a3c16a3634d8333826a',
+    'Lãi suất cho vay': '68898a3c16a3634d8333826b',
+    'Lãi suất tiền gửi': '68898a3c16a3634d8333826c',
+    'Lãi suất/hồ sơ': '68898a3c16a3634d8333826d',
+    'Lãi suất': '68898a3c16a3634d8333826f',
+    'Phí giao dịch': '68898a3c16a3634d83338271',
+    'Bảng giá/điện': '68898a3c16a3634d83338272',
+    'Đầu tư tài chính': '68898a3c16a3634d83338287',
+    'Định giá/đầu tư': '68898a3c16a3634d83338292',
+    'Công ty con': '68898a3c16a3634d83338297',
+    'Chính sách thuế': '68898a3c16a3634d833382b5',
+    'Điều khoản chính sách': '68898a3c16a3634d833382bb',
+    'Margin': '689556d689dc7939400b400b',
+    'Hiệu suất ứng dụng': '68898a3c16a3634d83338228',
+    'Tài khoản': '6890104716a3634d83338415',
+    'Chuyên khoa y tế': '68898a3c16a3634d83338242',
+    'Đồng kiểm': '68898a3c16a3634d8333821a',
+    'Hệ thống dẫn đường': '68898a3c16a3634d83338238',
+    'Hiệu suất tài xế': '68898a3c16a3634d833382ac',
+    'Đối tác tài xế': '68898a3c16a3634d833382ae',
+    'Mất & hỏng hàng': '689556d589dc7939400b4002',
+    'Độ đa dạng menu': '68898a3c16a3634d83338218',
+}
+
+ID_TO_LABEL = {label_id: label for label, label_id in LABEL_TO_ID.items()}
+
+UNKNOWN_LABEL_ID = "Label không tồn tại"
+
+
+def map_label_to_id(label_name):
+    return LABEL_TO_ID.get(label_name, UNKNOWN_LABEL_ID)
+
+
+def map_id_to_label(label_id):
+    return ID_TO_LABEL.get(label_id)
+
+
+def label_fields(best_label, llm_labels, tier):
+    # Các cột nhãn của một kết quả, dùng chung cho API (main.run_labeling) và bulk_label.py
+    best_label = best_label or []
+    return {
+        "label": best_label[0] if best_label else "",
+        "label_id": [map_label_to_id(label) if label else None for label in best_label],
+        "ref_label_map": best_label,
+        "ref_llm_label": llm_labels or [],
+        "tier": tier,
+    }
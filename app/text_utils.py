@@ -0,0 +1,11 @@
+import hashlib
+
+
+def get_text_signature(title: str, content: str, description: str) -> str:
+    combined_text = f"{title} {content} {description}".strip().lower()
+    return hashlib.md5(combined_text.encode('utf-8')).hexdigest()
+
+
+def merge_text(title: str, content: str, description: str) -> str:
+    parts = [title.strip(), content.strip(), description.strip()]
+    return " ".join(p for p in parts if p)
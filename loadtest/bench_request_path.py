@@ -0,0 +1,147 @@
+"""
+Đo overhead không-LLM của /api/label-inference: pipeline cũ (pandas + apply + iterrows +
+validate LabelResult + json) so với đường xử lý hiện tại (dedup một lượt + dict + orjson).
+
+Model, LLM và Pinecone được thay bằng hàm trả kết quả cố định để chỉ còn lại phần overhead.
+
+Chạy:
+    python loadtest/bench_request_path.py --sizes 1,50,1000 --dup-rate 0.1
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import types
+
+import pandas as pd
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+sys.path.insert(0, APP_DIR)
+
+
+def _install_model_stand_ins() -> None:
+    # Thay các module load model/gọi API bằng bản trả kết quả cố định, trước khi import main
+    def label_social_post(text, category, type, site_name, topic_name, deadline=None):
+        return {"labels": ["Giá cả", "Khuyến mãi"], "confidence": 0.9, "tier": "llm"}
+
+    def get_best_label_from_content(category, labels_input, deadline=None):
+        return ["Thảo luận giá cả"]
+
+    class _Batcher:
+        def stats(self):
+            return {}
+
+    stand_ins = {
+        "label_inference": {"label_social_post": label_social_post},
+        "similarity_label": {"get_best_label_from_content": get_best_label_from_content,
+                             "embedding_batcher": _Batcher(),
+                             "category_labels": lambda category, deadline=None: ["Thảo luận giá cả"],
+                             "nearest_taxonomy_label": lambda text, category, deadline=None: ("Thảo luận giá cả", 0.8),
+                             "warm_taxonomy_embeddings": lambda: None},
+        "ads_predict": {"ads_batcher": _Batcher()},
+        "transformers": {"pipeline": None, "AutoTokenizer": None, "AutoModelForSequenceClassification": None},
+        "vncorenlp": {"VnCoreNLP": None},
+        "torch": {},
+    }
+    for name, attrs in stand_ins.items():
+        if name in sys.modules:
+            continue
+        module = types.ModuleType(name)
+        module.__dict__.update(attrs)
+        sys.modules[name] = module
+
+
+_install_model_stand_ins()
+
+import main  # noqa: E402
+from load_test import PayloadFactory  # noqa: E402
+from taxonomy import LABEL_TO_ID  # noqa: E402
+
+
+# ====================== Pipeline cũ (để so sánh) ======================
+
+def legacy_map_label_to_id(label_name):
+    # Bản cũ dựng lại dict ~190 phần tử mỗi lần tra cứu
+    label_mapping = dict(LABEL_TO_ID)
+    return label_mapping.get(label_name, "Label không tồn tại")
+
+
+def legacy_label_posts(request: main.LabelRequest) -> bytes:
+    start_time = time.time()
+    category = request.category
+    records = [item.model_dump() for item in request.data]
+    df = pd.DataFrame(records)
+    df["merged_text"] = df.apply(lambda row: main.merge_text(row["title"], row["content"], row["description"]), axis=1)
+    df["text_signature"] = df.apply(
+        lambda row: main.get_text_signature(row["title"], row["content"], row["description"]), axis=1)
+    dedup_df = df.drop_duplicates(subset=["text_signature"])
+
+    label_mapping = {}
+    all_labels = {}
+    for _, row in dedup_df.iterrows():
+        result = main.label_social_post(text=row["merged_text"], category=category, type=row["type"],
+                                        site_name=row["site_name"], topic_name=row["topic_name"])
+        labels = result.get("labels", [])
+        best_label = main.get_best_label_from_content(labels_input=labels, category=category) if labels else ""
+        label_mapping[row["text_signature"]] = best_label
+        all_labels[row["text_signature"]] = labels
+
+    results = []
+    for _, row in df.iterrows():
+        sig = row["text_signature"]
+        best_label = label_mapping.get(sig, "")
+        full_labels = all_labels.get(sig, [])
+        results.append(main.LabelResult(
+            id=row["id"],
+            topic_id=row["topic_id"],
+            site_id=row["site_id"],
+            type=row["type"],
+            ref_label_map=best_label if best_label else [],
+            label=best_label[0] if best_label else "",
+            label_id=[legacy_map_label_to_id(label) for label in best_label] if best_label else [],
+            ref_llm_label=full_labels if full_labels else [],
+            process_time=time.time() - start_time,
+        ))
+    response = main.LabelResponse(results=results)
+    # FastAPI validate lại theo response_model rồi json.dumps
+    validated = main.LabelResponse.model_validate(response.model_dump())
+    return json.dumps(validated.model_dump(), ensure_ascii=False).encode("utf-8")
+
+
+def current_label_posts(request: main.LabelRequest) -> bytes:
+    return main.json_response({"results": main.run_labeling(request)}).body
+
+
+# ====================== Benchmark ======================
+
+def bench(fn, request, min_time: float) -> float:
+    fn(request)  # warm-up
+    runs, elapsed = 0, 0.0
+    while elapsed < min_time:
+        start = time.perf_counter()
+        fn(request)
+        elapsed += time.perf_counter() - start
+        runs += 1
+    return elapsed / runs
+
+
+def main_cli(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Per-request overhead of /api/label-inference without LLM calls")
+    parser.add_argument("--sizes", default="1,50,1000", help="Items per request, comma separated")
+    parser.add_argument("--dup-rate", type=float, default=0.1)
+    parser.add_argument("--min-time", type=float, default=1.0, help="Seconds to run each case")
+    args = parser.parse_args(argv)
+
+    print(f"{'items':>6} | {'before (ms)':>12} | {'after (ms)':>11} | {'speedup':>7}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        factory = PayloadFactory(size, size, args.dup_rate, long_text_rate=0.2, seed=size)
+        request = main.LabelRequest(**factory.request())
+        before = bench(legacy_label_posts, request, args.min_time)
+        after = bench(current_label_posts, request, args.min_time)
+        print(f"{size:>6} | {before * 1000:>12.3f} | {after * 1000:>11.3f} | {before / after:>6.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
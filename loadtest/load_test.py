@@ -0,0 +1,272 @@
+"""
+Sinh traffic `LabelRequest` tới /api/label-inference và đo throughput, latency, lỗi, RSS.
+
+Ví dụ (service chạy bằng gunicorn với env trỏ vào mock_services.py):
+    # Open-loop, tăng dần RPS để tìm điểm bão hòa
+    python loadtest/load_test.py --url http://127.0.0.1:8100 --rps 1,2,4,8 --duration 60 \\
+        --batch-size 1-5 --dup-rate 0.2 --server-pid $(pgrep -f "gunicorn main:app" | head -1)
+
+    # Closed-loop: 16 client, mỗi client gửi request kế tiếp khi nhận được phản hồi
+    python loadtest/load_test.py --url http://127.0.0.1:8100 --concurrency 16 --duration 60
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+import psutil
+
+CATEGORIES = ["FMCG", "Retail", "Banking", "Food & Beverage", "E-commerce", "Telecommunications & Internet"]
+POST_TYPES = ["fbPageTopic", "fbGroupTopic", "fbUserTopic", "newsTopic", "tiktokTopic", "forumTopic"]
+SITES = ["facebook.com", "tiktok.com", "vnexpress.net", "tinhte.vn", "fireant.vn", "shopee.vn"]
+TOPICS = ["Vinamilk", "Bách Hóa Xanh", "Techcombank", "Highlands Coffee", "Shopee", "Viettel"]
+
+SENTENCES = [
+    "Sản phẩm dùng khá ổn, giao hàng nhanh nhưng đóng gói hơi sơ sài.",
+    "Chương trình khuyến mãi cuối tuần này giảm tới 50% cho thành viên mới.",
+    "Mình gọi tổng đài ba lần mà vẫn chưa được hỗ trợ, quá thất vọng.",
+    "Giá tăng liên tục mấy tháng nay, so với bên khác thì đắt hơn hẳn.",
+    "Ứng dụng mới cập nhật bị lỗi đăng nhập, không chuyển khoản được.",
+    "Sự kiện ra mắt sản phẩm mới tổ chức tại TP.HCM thu hút rất đông khách.",
+    "Minigame tuần này: comment và share để nhận voucher 100k.",
+    "Tuyển gấp nhân viên bán hàng, lương cứng 8 triệu, thưởng doanh số.",
+    "Cổ phiếu tăng trần phiên sáng nay sau báo cáo lợi nhuận quý.",
+    "Nhân viên tư vấn nhiệt tình, cửa hàng sạch sẽ, sẽ quay lại lần sau.",
+    "Pass lại máy lọc nước còn bảo hành 6 tháng, giá tốt cho ai cần.",
+    "Livestream tối nay có nhiều deal hời, nhớ canh giờ vàng nhé.",
+]
+
+
+# ====================== Payload ======================
+
+class PayloadFactory:
+    def __init__(self, batch_min: int, batch_max: int, dup_rate: float, long_text_rate: float, seed: int,
+                 deadline_ms: Optional[int] = None):
+        self.batch_min = batch_min
+        self.batch_max = batch_max
+        self.dup_rate = dup_rate
+        self.long_text_rate = long_text_rate
+        self.deadline_ms = deadline_ms
+        self.rng = random.Random(seed)
+        self._history: List[Dict[str, str]] = []
+
+    def _text(self) -> Dict[str, str]:
+        # Một phần bài dài (>100 từ) để đi qua nhánh summarize_text_locally
+        n_sentences = self.rng.randint(12, 25) if self.rng.random() < self.long_text_rate else self.rng.randint(1, 4)
+        content = " ".join(self.rng.choice(SENTENCES) for _ in range(n_sentences))
+        return {
+            "title": self.rng.choice(SENTENCES) if self.rng.random() < 0.3 else "",
+            "content": f"{content} #{uuid.uuid4().hex[:6]}",
+            "description": "",
+        }
+
+    def item(self) -> dict:
+        # Trùng lặp: dùng lại nội dung đã gửi trước đó (cùng text_signature)
+        if self._history and self.rng.random() < self.dup_rate:
+            text = self.rng.choice(self._history)
+        else:
+            text = self._text()
+            self._history.append(text)
+            if len(self._history) > 5000:
+                self._history.pop(0)
+        return {
+            "id": uuid.uuid4().hex,
+            "topic_name": self.rng.choice(TOPICS),
+            "type": self.rng.choice(POST_TYPES),
+            "topic_id": str(self.rng.randint(1, 500)),
+            "site_id": str(self.rng.randint(1, 5000)),
+            "site_name": self.rng.choice(SITES),
+            **text,
+        }
+
+    def request(self) -> dict:
+        size = self.rng.randint(self.batch_min, self.batch_max)
+        payload = {"category": self.rng.choice(CATEGORIES), "data": [self.item() for _ in range(size)]}
+        if self.deadline_ms is not None:
+            payload["deadline_ms"] = self.deadline_ms
+        return payload
+
+
+# ====================== Metrics ======================
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+class StageMetrics:
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: List[float] = []
+        self.statuses: Counter = Counter()
+        self.items = 0
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.rss: Dict[int, List[int]] = defaultdict(list)
+
+    def record(self, latency: float, status: str, items: int) -> None:
+        self.statuses[status] += 1
+        if status == "200":
+            self.latencies.append(latency)
+            self.items += items
+
+    def summary(self) -> dict:
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        total = sum(self.statuses.values())
+        ok = self.statuses.get("200", 0)
+        return {
+            "stage": self.name,
+            "requests": total,
+            "elapsed_s": round(elapsed, 2),
+            "throughput_rps": round(ok / elapsed, 3) if elapsed else 0.0,
+            "throughput_items_s": round(self.items / elapsed, 3) if elapsed else 0.0,
+            # Latency chỉ tính trên request thành công
+            "p50_ms": round(percentile(self.latencies, 50) * 1000, 1),
+            "p95_ms": round(percentile(self.latencies, 95) * 1000, 1),
+            "p99_ms": round(percentile(self.latencies, 99) * 1000, 1),
+            "error_rate": round((total - ok) / total, 4) if total else 0.0,
+            "statuses": dict(self.statuses),
+            "worker_rss_mb": {
+                str(pid): {"mean": round(sum(v) / len(v) / 2**20, 1), "max": round(max(v) / 2**20, 1)}
+                for pid, v in self.rss.items()
+            },
+        }
+
+
+async def sample_rss(server_pid: Optional[int], metrics: StageMetrics, interval: float) -> None:
+    # RSS của master gunicorn và từng worker con
+    if server_pid is None:
+        return
+    master = psutil.Process(server_pid)
+    while True:
+        try:
+            procs = [master] + master.children(recursive=True)
+        except psutil.NoSuchProcess:
+            return
+        for proc in procs:
+            try:
+                metrics.rss[proc.pid].append(proc.memory_info().rss)
+            except psutil.NoSuchProcess:
+                pass
+        await asyncio.sleep(interval)
+
+
+# ====================== Traffic ======================
+
+async def send(client: httpx.AsyncClient, url: str, payload: dict, metrics: StageMetrics) -> None:
+    start = time.perf_counter()
+    try:
+        response = await client.post(url, json=payload)
+        status = str(response.status_code)
+    except httpx.TimeoutException:
+        status = "timeout"
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    metrics.record(time.perf_counter() - start, status, len(payload["data"]))
+
+
+async def run_open_loop(client, url, factory, rps: float, duration: float, metrics: StageMetrics) -> None:
+    # Fixed RPS: lịch gửi cố định, không chờ phản hồi (tránh coordinated omission)
+    tasks = []
+    interval = 1.0 / rps
+    start = time.perf_counter()
+    n = 0
+    while time.perf_counter() - start < duration:
+        tasks.append(asyncio.create_task(send(client, url, factory.request(), metrics)))
+        n += 1
+        await asyncio.sleep(max(0.0, start + n * interval - time.perf_counter()))
+    await asyncio.gather(*tasks)
+
+
+async def run_closed_loop(client, url, factory, concurrency: int, duration: float, metrics: StageMetrics) -> None:
+    deadline = time.perf_counter() + duration
+
+    async def user():
+        while time.perf_counter() < deadline:
+            await send(client, url, factory.request(), metrics)
+
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+
+
+async def run(args) -> List[dict]:
+    factory = PayloadFactory(args.batch_min, args.batch_max, args.dup_rate, args.long_text_rate, args.seed,
+                             deadline_ms=args.deadline_ms)
+    url = args.url.rstrip("/") + "/api/label-inference"
+    if args.concurrency:
+        stages = [("closed", c) for c in args.concurrency]
+    else:
+        stages = [("open", r) for r in args.rps]
+
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=100)
+    summaries = []
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        for mode, level in stages:
+            metrics = StageMetrics(f"{mode}:{level}")
+            rss_task = asyncio.create_task(sample_rss(args.server_pid, metrics, args.rss_interval))
+            if mode == "open":
+                await run_open_loop(client, url, factory, level, args.duration, metrics)
+            else:
+                await run_closed_loop(client, url, factory, int(level), args.duration, metrics)
+            metrics.finished = time.perf_counter()
+            rss_task.cancel()
+            summary = metrics.summary()
+            summaries.append(summary)
+            print(format_summary(summary), flush=True)
+    return summaries
+
+
+def format_summary(s: dict) -> str:
+    rss = ", ".join(f"{pid}:{v['max']}MB" for pid, v in s["worker_rss_mb"].items()) or "n/a"
+    return (f"[{s['stage']}] {s['requests']} req in {s['elapsed_s']}s | {s['throughput_rps']} rps, "
+            f"{s['throughput_items_s']} items/s | p50 {s['p50_ms']}ms p95 {s['p95_ms']}ms p99 {s['p99_ms']}ms | "
+            f"errors {s['error_rate']:.2%} {s['statuses']} | max RSS {rss}")
+
+
+def _float_list(value: str) -> List[float]:
+    return [float(v) for v in value.split(",") if v]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load test for /api/label-inference")
+    parser.add_argument("--url", default="http://127.0.0.1:8100", help="Base URL of the labeling API")
+    parser.add_argument("--rps", type=_float_list, default=[1.0],
+                        help="Open-loop request rates, comma separated (each runs one stage)")
+    parser.add_argument("--concurrency", type=_float_list, default=None,
+                        help="Closed-loop client counts, comma separated (overrides --rps)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds per stage")
+    parser.add_argument("--batch-size", default="1-5", help="Items per request, N or MIN-MAX")
+    parser.add_argument("--dup-rate", type=float, default=0.1, help="Fraction of items reusing earlier text")
+    parser.add_argument("--long-text-rate", type=float, default=0.2, help="Fraction of items longer than 100 words")
+    parser.add_argument("--deadline-ms", type=int, default=None, help="Latency budget sent as deadline_ms")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Client timeout in seconds")
+    parser.add_argument("--server-pid", type=int, default=None, help="Gunicorn master PID for per-worker RSS")
+    parser.add_argument("--rss-interval", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write the stage summaries as JSON")
+    args = parser.parse_args(argv)
+    lo, _, hi = args.batch_size.partition("-")
+    args.batch_min, args.batch_max = int(lo), int(hi or lo)
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    summaries = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summaries, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+Mock OpenAI / Pinecone / Langfuse cho load test, không tốn quota thật.
+
+Chạy:
+    python loadtest/mock_services.py --port 9000 --llm-latency-ms 800 --llm-latency-sigma 0.5 --rate-limit-prob 0.02
+
+Trỏ service vào mock bằng biến môi trường:
+    OPENAI_BASE_URL=http://127.0.0.1:9000/v1
+    PINECONE_INDEX_HOST=http://127.0.0.1:9000
+    LANGFUSE_HOST=http://127.0.0.1:9000
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# Một phần taxonomy thật để kết quả trả về đi qua được map_label_to_id
+SAMPLE_LABELS = [
+    "Chất lượng sản phẩm", "Chương trình khuyến mãi", "Thảo luận giá cả", "Chăm sóc khách hàng",
+    "Trải nghiệm sử dụng", "Hoạt động truyền thông", "Đánh giá sản phẩm", "Thời gian giao hàng",
+    "Khiếu nại khách hàng", "Sự kiện", "Voucher", "Đề cập chung",
+]
+
+
+class MockConfig:
+    llm_latency_ms: float = 800.0
+    llm_latency_sigma: float = 0.5
+    rate_limit_prob: float = 0.0
+    pinecone_latency_ms: float = 30.0
+    pinecone_latency_sigma: float = 0.3
+    seed: int = 0
+
+
+config = MockConfig()
+rng = random.Random(config.seed)
+app = FastAPI(title="Load-test mock services")
+
+stats = {"chat_completions": 0, "rate_limited": 0, "pinecone_queries": 0, "langfuse_events": 0}
+
+
+def _sample_latency(median_ms: float, sigma: float) -> float:
+    # Log-normal: median = median_ms, đuôi dài giống latency thật của API
+    if median_ms <= 0:
+        return 0.0
+    return rng.lognormvariate(0.0, sigma) * median_ms / 1000.0
+
+
+# ====================== OpenAI ======================
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    stats["chat_completions"] += 1
+
+    if rng.random() < config.rate_limit_prob:
+        stats["rate_limited"] += 1
+        return JSONResponse(
+            status_code=429,
+            headers={"retry-after-ms": "200"},
+            content={"error": {"message": "Rate limit reached (mock)", "type": "requests", "code": "rate_limit_exceeded"}},
+        )
+
+    await asyncio.sleep(_sample_latency(config.llm_latency_ms, config.llm_latency_sigma))
+
+    labels = rng.sample(SAMPLE_LABELS, k=rng.randint(1, 3))
+    content = json.dumps({"labels": labels, "confidence": round(rng.uniform(0.5, 1.0), 2)}, ensure_ascii=False)
+    prompt_tokens = sum(len(str(m.get("content", ""))) for m in body.get("messages", [])) // 4
+    completion_tokens = len(content) // 4
+    return {
+        "id": f"chatcmpl-mock-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4o-mini"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+# ====================== Pinecone ======================
+
+@app.post("/query")
+async def pinecone_query(request: Request):
+    body = await request.json()
+    stats["pinecone_queries"] += 1
+    await asyncio.sleep(_sample_latency(config.pinecone_latency_ms, config.pinecone_latency_sigma))
+
+    category = (body.get("filter") or {}).get("category", "")
+    top_k = int(body.get("topK", body.get("top_k", 1)))
+    matches = [
+        {
+            "id": uuid.uuid4().hex[:16],
+            "score": round(rng.uniform(0.5, 0.95), 4),
+            "values": [],
+            "metadata": {"label": label, "category": category},
+        }
+        for label in rng.sample(SAMPLE_LABELS, k=min(top_k, len(SAMPLE_LABELS)))
+    ]
+    return {"matches": matches, "namespace": body.get("namespace", ""), "usage": {"readUnits": 5}}
+
+
+# ====================== Langfuse (null sink) ======================
+
+@app.api_route("/api/public/{path:path}", methods=["GET", "POST", "PUT", "PATCH"])
+async def langfuse_sink(path: str, request: Request):
+    await request.body()
+    stats["langfuse_events"] += 1
+    return JSONResponse(status_code=200, content={"successes": [], "errors": []})
+
+
+@app.get("/mock/stats")
+async def mock_stats():
+    return stats
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Mock OpenAI/Pinecone/Langfuse for load testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--llm-latency-ms", type=float, default=MockConfig.llm_latency_ms, help="Median LLM latency")
+    parser.add_argument("--llm-latency-sigma", type=float, default=MockConfig.llm_latency_sigma,
+                        help="Log-normal sigma of LLM latency (0 = fixed)")
+    parser.add_argument("--rate-limit-prob", type=float, default=MockConfig.rate_limit_prob,
+                        help="Probability of answering a chat completion with 429")
+    parser.add_argument("--pinecone-latency-ms", type=float, default=MockConfig.pinecone_latency_ms)
+    parser.add_argument("--pinecone-latency-sigma", type=float, default=MockConfig.pinecone_latency_sigma)
+    parser.add_argument("--seed", type=int, default=MockConfig.seed)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    config.llm_latency_ms = args.llm_latency_ms
+    config.llm_latency_sigma = args.llm_latency_sigma
+    config.rate_limit_prob = args.rate_limit_prob
+    config.pinecone_latency_ms = args.pinecone_latency_ms
+    config.pinecone_latency_sigma = args.pinecone_latency_sigma
+    rng.seed(args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")